@@ -1,11 +1,20 @@
 import os
-import json
+import re
+import time
+import sqlite3
+import threading
+import orjson
 import requests
-import pandas as pd
-from typing import Dict, List, Optional, Union
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Callable, Dict, Iterator, List, Optional, Union
+from datetime import datetime, timedelta
 from enum import Enum
-from dataclasses import dataclass
+from collections import Counter
+from functools import lru_cache, partial
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 import logging
 
 # Fivetran connector SDK imports
@@ -24,6 +33,166 @@ logging.basicConfig(
 )
 logger = logging.getLogger('BMWVinDecoderConnector')
 
+NHTSA_BASE_URL = "https://vpic.nhtsa.dot.gov/api/vehicles"
+
+# SQLite file holding decoded VINs between syncs; defaults to the connector's own directory
+VPIC_CACHE_PATH = os.environ.get(
+    'BMW_VPIC_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bmw_vpic_cache.sqlite')
+)
+
+# Decode results don't change for a VIN, so keep them this long
+_DECODE_CACHE_TTL = timedelta(days=30)
+
+# Decode fields read by BMWVinDecoder; NHTSA returns ~130 per VIN. VIN ties batch rows back to their input.
+_NEEDED_FIELDS = frozenset({
+    'VIN', 'Model', 'ModelYear', 'BodyClass', 'EngineConfiguration',
+    'TransmissionStyle', 'DriveType', 'DateProduced'
+})
+
+
+@lru_cache(maxsize=None)
+def _get_session() -> requests.Session:
+    """Shared HTTP session; every call goes to the same host, so keep connections alive and pooled"""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=32,
+        # The batch decode POST is idempotent, so retry it like the GETs
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset({"GET", "POST"})
+        )
+    ))
+    return session
+
+
+def _filter_results(row: Dict) -> Dict:
+    """Keep the fields we read, dropping the empty and zero placeholders NHTSA returns for unknown values"""
+    return {key: value for key, value in row.items() if key in _NEEDED_FIELDS and value and value != '0'}
+
+
+class _DecodeCache:
+    """
+    Filtered NHTSA decode results stored per VIN in SQLite, so they survive across syncs
+    
+    Entries are keyed by upper-cased VIN rather than by request, so changing the
+    configured fleet doesn't invalidate the VINs an earlier sync already decoded.
+    """
+    
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS decoded_vins "
+                "(vin TEXT PRIMARY KEY, results BLOB NOT NULL, stored_at REAL NOT NULL)"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, vins: List[str]) -> Dict[str, Dict]:
+        """
+        Look up unexpired results for distinct, upper-cased VINs
+        
+        Args:
+            vins (List[str]): Up to 50 VINs
+            
+        Returns:
+            Dict[str, Dict]: Cached results keyed by VIN; misses are absent
+        """
+        cutoff = time.time() - _DECODE_CACHE_TTL.total_seconds()
+        placeholders = ",".join("?" * len(vins))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT vin, results FROM decoded_vins WHERE stored_at >= ? AND vin IN ({placeholders})",
+                (cutoff, *vins)
+            ).fetchall()
+            self.hits += len(rows)
+            self.misses += len(vins) - len(rows)
+        return {vin: orjson.loads(results) for vin, results in rows}
+
+    def put_many(self, results: Dict[str, Dict]) -> None:
+        """Store results keyed by upper-cased VIN; a failed write only costs a later re-fetch"""
+        now = time.time()
+        try:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO decoded_vins (vin, results, stored_at) VALUES (?, ?, ?)",
+                    [(vin, orjson.dumps(row), now) for vin, row in results.items()]
+                )
+        except sqlite3.Error as e:
+            logger.warning("Could not write %d VINs to the decode cache: %s", len(results), e)
+
+    def clear(self) -> None:
+        """Drop every cached result"""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM decoded_vins")
+
+
+@lru_cache(maxsize=None)
+def _get_decode_cache() -> _DecodeCache:
+    """Shared decode cache for the process; falls back to memory if the file can't be used"""
+    try:
+        return _DecodeCache(VPIC_CACHE_PATH)
+    except sqlite3.Error as e:
+        logger.warning("Decode cache %s unavailable, caching in memory for this run: %s", VPIC_CACHE_PATH, e)
+        return _DecodeCache(":memory:")
+
+
+def _fetch_decodes(vins: List[str]) -> Dict[str, Dict]:
+    """
+    Fetch the NHTSA decode results for up to 50 VINs in one batch request
+    
+    Args:
+        vins (List[str]): 17-character VINs
+        
+    Returns:
+        Dict[str, Dict]: Non-empty decode values keyed by field name, per upper-cased VIN
+    """
+    url = f"{NHTSA_BASE_URL}/DecodeVINValuesBatch/"
+    response = _get_session().post(url, data={"format": "json", "data": ";".join(vins)}, timeout=10)
+    response.raise_for_status()
+    
+    # Even a full batch is a few hundred KB, which orjson parses faster than a streaming parser
+    # could skip through it; only _NEEDED_FIELDS outlive this call
+    data = orjson.loads(response.content)
+    return {row.get('VIN', '').upper(): _filter_results(row) for row in data['Results']}
+
+
+def _decode_vins(vins: List[str]) -> Dict[str, Dict]:
+    """
+    Decode up to 50 VINs, sending only the ones missing from the decode cache to NHTSA
+    
+    Args:
+        vins (List[str]): 17-character VINs
+        
+    Returns:
+        Dict[str, Dict]: Non-empty decode values keyed by field name, per upper-cased VIN
+    """
+    keys = list(dict.fromkeys(vin.upper() for vin in vins))
+    cache = _get_decode_cache()
+    results = cache.get_many(keys)
+    misses = [vin for vin in keys if vin not in results]
+    if misses:
+        fetched = _fetch_decodes(misses)
+        fetched = {vin: fetched[vin] for vin in misses if vin in fetched}
+        cache.put_many(fetched)
+        results.update(fetched)
+    return results
+
+
+def _get_recalls(vin: str) -> List[Dict]:
+    """Fetch the NHTSA recalls for a VIN; never memoized, so new recalls show up on the next sync"""
+    url = f"{NHTSA_BASE_URL}/recalls/vin/{vin}?format=json"
+    response = _get_session().get(url, timeout=10)
+    response.raise_for_status()
+    
+    data = orjson.loads(response.content)
+    return data.get('Results', [])
+
 class BMWSeriesEnum(Enum):
     """Enum for BMW Series classification"""
     SERIES_1 = "1"
@@ -39,7 +208,7 @@ class BMWSeriesEnum(Enum):
     SERIES_I = "i"
     UNKNOWN = "Unknown"
 
-@dataclass
+@dataclass(slots=True)
 class BMWVehicleInfo:
     """Data class for storing BMW vehicle information"""
     vin: str
@@ -52,7 +221,7 @@ class BMWVehicleInfo:
     drive_type: str
     manufacturing_plant: str
     production_date: Optional[str] = None
-    decoded_date: str = datetime.now().isoformat()
+    decoded_date: str = field(default_factory=lambda: datetime.now().isoformat())
 
     def to_record(self):
         """Convert to Fivetran Record"""
@@ -73,19 +242,51 @@ class BMWVehicleInfo:
 class BMWVinDecoder:
     """VIN decoder specifically for BMW vehicles"""
     
+    # Precomputed series lookup: the leftmost digit names the series (M340i is a 3, 740Li a 7);
+    # X, M and i, in that order, only apply to names without one
+    _SERIES_RE = re.compile('[1-8]')
+    _SERIES_LETTERS = tuple((s.value, s) for s in (BMWSeriesEnum.SERIES_X, BMWSeriesEnum.SERIES_M, BMWSeriesEnum.SERIES_I))
+    _SERIES_MAP = {s.value: s for s in BMWSeriesEnum}
+    
+    # Maximum number of VINs the NHTSA batch endpoint accepts per request
+    _BATCH_SIZE = 50
+    
+    # BMW manufacturer codes; 5UX and 5YM cover US-built SUVs, WBX German-built SUVs
+    _BMW_PREFIXES = frozenset(('WBA', 'WBS', 'WBX', 'WBY', '4US', '5UX', '5YM'))
+    
+    # Plant code (VIN position 12) to manufacturing plant
+    _PLANT_CODES = {
+        'A': 'Greer, SC, USA',
+        'B': 'Dingolfing, Germany',
+        'C': 'Munich, Germany',
+        'L': 'Leipzig, Germany',
+        'N': 'Regensburg, Germany',
+        'P': 'Munich, Germany',
+        'R': 'Spartanburg, SC, USA',
+        'U': 'Rosslyn, South Africa',
+        'W': 'Born, Netherlands'
+    }
+    
     def __init__(self):
-        self.base_url = "https://vpic.nhtsa.dot.gov/api/vehicles"
-        self._plant_codes = {
-            'A': 'Greer, SC, USA',
-            'B': 'Dingolfing, Germany',
-            'C': 'Munich, Germany',
-            'L': 'Leipzig, Germany',
-            'N': 'Regensburg, Germany',
-            'P': 'Munich, Germany',
-            'R': 'Spartanburg, SC, USA',
-            'U': 'Rosslyn, South Africa',
-            'W': 'Born, Netherlands'
-        }
+        self.base_url = NHTSA_BASE_URL
+        self._session = _get_session()
+
+    def close(self) -> None:
+        """Release pooled connections; the session reconnects on next use"""
+        # Close only the adapters: the session, and any response cache behind it, is shared process-wide
+        for adapter in self._session.adapters.values():
+            adapter.close()
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop cached NHTSA decode results"""
+        _get_decode_cache().clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _validate_bmw_vin(self, vin: str) -> bool:
         """
@@ -100,20 +301,56 @@ class BMWVinDecoder:
         if len(vin) != 17:
             raise ValueError("VIN must be 17 characters long")
         
-        # BMW manufacturer codes (WBA, WBS, WBY, 4US)
-        bmw_prefixes = ['WBA', 'WBS', 'WBY', '4US']
-        if vin[:3] not in bmw_prefixes:
+        if vin[:3] not in self._BMW_PREFIXES:
             raise ValueError("Not a valid BMW VIN prefix")
         
         return True
 
-    def _determine_bmw_series(self, model_name: str) -> BMWSeriesEnum:
-        """Determine BMW series from model name"""
-        for series in BMWSeriesEnum:
-            if series.value in model_name:
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def _determine_bmw_series(cls, model_name: str) -> BMWSeriesEnum:
+        """
+        Determine BMW series from the model name, memoized per model
+        
+        >>> [BMWVinDecoder._determine_bmw_series(m).value for m in ("M340i", "X5", "iX", "XM", "740Li", "i4")]
+        ['3', '5', 'X', 'X', '7', '4']
+        """
+        m = cls._SERIES_RE.search(model_name)
+        if m:
+            return cls._SERIES_MAP[m.group(0)]
+        for value, series in cls._SERIES_LETTERS:
+            if value in model_name:
                 return series
         return BMWSeriesEnum.UNKNOWN
 
+    def _build_record(self, vin: str, results: Dict, decoded_date: str) -> Dict:
+        """Build a Fivetran Record directly from NHTSA decode values"""
+        # Extract BMW-specific information
+        model_name = results.get('Model', 'Unknown')
+        series = self._determine_bmw_series(model_name)
+        # Non-numeric years fall back to 0 rather than failing the whole VIN
+        raw_year = results.get('ModelYear') or '0'
+        model_year = int(raw_year) if raw_year.isdecimal() else 0
+        
+        return {
+            "vin": vin,
+            "series": series.value,
+            "model_year": model_year,
+            "model_name": model_name,
+            "body_type": results.get('BodyClass', 'Unknown'),
+            "engine_type": results.get('EngineConfiguration', 'Unknown'),
+            "transmission": results.get('TransmissionStyle', 'Unknown'),
+            "drive_type": results.get('DriveType', 'Unknown'),
+            "manufacturing_plant": self._PLANT_CODES.get(vin[11], 'Unknown'),
+            "production_date": results.get('DateProduced', None),
+            "decoded_date": decoded_date
+        }
+
+    @staticmethod
+    def _to_vehicle_info(record: Dict) -> BMWVehicleInfo:
+        """Convert a Fivetran Record back into typed vehicle information"""
+        return BMWVehicleInfo(**{**record, "series": BMWSeriesEnum(record["series"])})
+
     def decode_bmw_vin(self, vin: str) -> BMWVehicleInfo:
         """
         Decode a BMW VIN with enhanced information
@@ -124,64 +361,96 @@ class BMWVinDecoder:
         Returns:
             BMWVehicleInfo: Detailed BMW vehicle information
         """
-        try:
-            #self._validate_bmw_vin(vin)
-            
-            url = f"{self.base_url}/decodevin/{vin}?format=json"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            results = {item['Variable']: item['Value'] for item in data['Results'] if item['Value'] and item['Value'] != '0'}
+        return self._to_vehicle_info(self.decode_bmw_vin_as_record(vin))
+
+    def decode_bmw_vin_as_record(self, vin: str) -> Dict:
+        """
+        Decode a BMW VIN straight into a Fivetran Record, skipping BMWVehicleInfo
+        
+        Args:
+            vin (str): 17-character BMW VIN
             
-            # Extract BMW-specific information
-            model_name = results.get('Model', 'Unknown')
-            series = self._determine_bmw_series(model_name)
+        Returns:
+            Dict: Fivetran Record for the bmw_vehicles table
+        """
+        self._validate_bmw_vin(vin)
+        
+        results = _decode_vins([vin]).get(vin.upper())
+        if results is None:
+            raise ValueError(f"NHTSA response is missing VIN {vin}")
+        return self._build_record(vin, results, datetime.now().isoformat())
+
+    def decode_bmw_vins_batch(self, vins: List[str]) -> List[BMWVehicleInfo]:
+        """
+        Decode BMW VINs through the NHTSA batch endpoint, 50 VINs per request
+        
+        Args:
+            vins (List[str]): 17-character BMW VINs
             
-            return BMWVehicleInfo(
-                vin=vin,
-                series=series,
-                model_year=int(results.get('ModelYear', 0)),
-                model_name=model_name,
-                body_type=results.get('BodyClass', 'Unknown'),
-                engine_type=results.get('EngineConfiguration', 'Unknown'),
-                transmission=results.get('TransmissionStyle', 'Unknown'),
-                drive_type=results.get('DriveType', 'Unknown'),
-                manufacturing_plant=self._plant_codes.get(vin[11], 'Unknown'),
-                production_date=results.get('DateProduced', None)
-            )
+        Returns:
+            List[BMWVehicleInfo]: Detailed BMW vehicle information, in input order
+        """
+        return [self._to_vehicle_info(record) for record in self.decode_bmw_vins_batch_as_records(vins)]
+
+    def decode_bmw_vins_batch_as_records(
+        self,
+        vins: List[str],
+        decoded_date: Optional[str] = None,
+        on_invalid: Optional[Callable[[str, ValueError], None]] = None
+    ) -> List[Dict]:
+        """
+        Decode BMW VINs through the NHTSA batch endpoint straight into Fivetran Records
+        
+        Args:
+            vins (List[str]): 17-character BMW VINs
+            decoded_date (Optional[str]): Timestamp shared by every record; defaults to now
+            on_invalid (Optional[Callable]): Called with each skipped VIN and its error; defaults to logging it
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {str(e)}")
-            raise
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parsing error: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
-            raise
+        Returns:
+            List[Dict]: Fivetran Records for the bmw_vehicles table, in input order
+        """
+        decoded_date = decoded_date or datetime.now().isoformat()
+        # Drop invalid VINs up front so they never cost a request or fail the batch
+        valid_vins = []
+        for vin in vins:
+            try:
+                self._validate_bmw_vin(vin)
+                valid_vins.append(vin)
+            except ValueError as e:
+                if on_invalid is None:
+                    logger.error("Skipping VIN %s: %s", vin, e)
+                else:
+                    on_invalid(vin, e)
+        vins = valid_vins
+        
+        records = []
+        for start in range(0, len(vins), self._BATCH_SIZE):
+            batch = vins[start:start + self._BATCH_SIZE]
+            # Match rows on their own VIN rather than trusting the response order
+            rows = _decode_vins(batch)
+            missing = [vin for vin in batch if vin.upper() not in rows]
+            if missing:
+                raise ValueError(f"NHTSA batch response is missing VINs: {', '.join(missing)}")
+            for vin in batch:
+                records.append(self._build_record(vin, rows[vin.upper()], decoded_date))
+        return records
 
     def get_bmw_recalls(self, vin: str) -> List[Dict]:
         """Get recall information for a BMW vehicle"""
-        try:
-            #self._validate_bmw_vin(vin)
-            
-            url = f"{self.base_url}/recalls/vin/{vin}?format=json"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            return data.get('Results', [])
-            
-        except Exception as e:
-            logger.error(f"Error fetching recalls: {str(e)}")
-            raise
+        self._validate_bmw_vin(vin)
+        
+        return _get_recalls(vin)
 
 
 # Define Fivetran connector classes
 class BMWVehicleSource():
     """Fivetran Source for BMW vehicle information"""
     
+    # Concurrent requests; stays under the decoder session's pool size
+    _MAX_WORKERS = 25
+    # Per-VIN errors of one type logged individually before only counting them
+    _MAX_LOGGED_ERRORS = 10
+    
     def __init__(self, config: Dict):
         """
         Initialize the source
@@ -189,8 +458,22 @@ class BMWVehicleSource():
         Args:
             config: The connector configuration
         """
-        self.vins = config.get('vins', [])
+        # Duplicate VINs would each cost a request; drop them while keeping order
+        self.vins = list(dict.fromkeys(config.get('vins', [])))
         self.decoder = BMWVinDecoder()
+        self._err_counts = Counter()
+        # Skipped VINs are reported from pool threads
+        self._err_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Release the decoder's pooled connections"""
+        self.decoder.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
         
     def get_primary_keys(self) -> Dict[str, List[str]]:
         """Define primary keys for tables"""
@@ -210,33 +493,51 @@ class BMWVehicleSource():
         # Not implementing state management for simplicity
         pass
     
-    def fetch_records(self, table_name: str, last_state: Dict) -> List[{}]:
+    def fetch_records(self, table_name: str, last_state: Dict) -> Iterator[Dict]:
         """
         Fetch records for the specified table
         
+        Requests run on a bounded thread pool sharing the decoder's pooled
+        session. Only _MAX_WORKERS requests are in flight at once, and a new
+        one is submitted as each completes, so memory stays bounded and a
+        slow consumer throttles fetching.
+        
         Args:
             table_name: Name of the table to fetch
             last_state: Previous sync state
             
-        Returns:
-            List of Fivetran Records
+        Yields:
+            Fivetran Records
         """
-        records = []
-        
-        if table_name == "bmw_vehicles":
-            for vin in self.vins:
-                try:
-                    vehicle_info = self.decoder.decode_bmw_vin(vin)
-                    records.append(vehicle_info.to_record())
-                except Exception as e:
-                    logger.error(f"Error processing VIN {vin}: {str(e)}")
-        
-        elif table_name == "bmw_recalls":
-            for vin in self.vins:
-                try:
-                    recalls = self.decoder.get_bmw_recalls(vin)
+        self._err_counts.clear()
+        try:
+            if table_name == "bmw_vehicles":
+                # One batch request decodes each chunk of VINs; all rows in a sync share one timestamp
+                batch_ts = datetime.now().isoformat()
+                size = BMWVinDecoder._BATCH_SIZE
+                chunks = (self.vins[start:start + size] for start in range(0, len(self.vins), size))
+                decode = partial(
+                    self.decoder.decode_bmw_vins_batch_as_records,
+                    decoded_date=batch_ts,
+                    on_invalid=lambda vin, e: self._log_fetch_error(e, "Skipping VIN %s: %s", vin, e)
+                )
+                for vins, future in self._map_bounded(decode, chunks):
+                    try:
+                        records = future.result()
+                    except Exception as e:
+                        self._log_fetch_error(e, "Error processing VINs %s to %s: %s", vins[0], vins[-1], e)
+                        continue
+                    yield from records
+            
+            elif table_name == "bmw_recalls":
+                for vin, future in self._map_bounded(self.decoder.get_bmw_recalls, self.vins):
+                    try:
+                        recalls = future.result()
+                    except Exception as e:
+                        self._log_fetch_error(e, "Error fetching recalls for VIN %s: %s", vin, e)
+                        continue
                     for recall in recalls:
-                        record = {
+                        yield {
                             "vin": vin,
                             "campaign_number": recall.get("CampaignNumber", "Unknown"),
                             "component": recall.get("Component", "Unknown"),
@@ -245,11 +546,45 @@ class BMWVehicleSource():
                             "remedy": recall.get("Remedy", ""),
                             "recall_date": recall.get("ReportReceivedDate", "")
                         }
-                        records.append(record)
-                except Exception as e:
-                    logger.error(f"Error fetching recalls for VIN {vin}: {str(e)}")
+        finally:
+            for error_type, count in self._err_counts.items():
+                if count > self._MAX_LOGGED_ERRORS:
+                    logger.error("%s: %d %s errors, only the first %d logged", table_name, count, error_type, self._MAX_LOGGED_ERRORS)
+
+    def _map_bounded(self, fn, items) -> Iterator:
+        """
+        Run fn over items on a thread pool with at most _MAX_WORKERS calls in flight
         
-        return records
+        Args:
+            fn: Blocking callable taking one item
+            items: Iterable of items
+            
+        Yields:
+            (item, future) pairs in completion order
+        """
+        executor = ThreadPoolExecutor(max_workers=self._MAX_WORKERS)
+        try:
+            items = iter(items)
+            pending = {executor.submit(fn, item): item for item in islice(items, self._MAX_WORKERS)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # Refill the window before handing the result out so the pool stays busy
+                    for item in islice(items, 1):
+                        pending[executor.submit(fn, item)] = item
+                    yield pending.pop(future), future
+        finally:
+            # If the consumer stops early, drop queued work instead of waiting for it
+            executor.shutdown(cancel_futures=True)
+
+    def _log_fetch_error(self, error: Exception, message: str, *args) -> None:
+        """Log a per-VIN error, counting rather than logging repeats once an error type is noisy"""
+        error_type = type(error).__name__
+        with self._err_lock:
+            self._err_counts[error_type] += 1
+            count = self._err_counts[error_type]
+        if count <= self._MAX_LOGGED_ERRORS:
+            logger.error(message, *args)
 
 
 # Define Fivetran connector schema
@@ -322,14 +657,13 @@ class BMWVinDecoderConnector():
             True if connection successful, False otherwise
         """
         try:
-            # Test API connection with a sample VIN
-            decoder = BMWVinDecoder()
+            # Test API connection with a sample VIN; the shared decoder stays open for the sync
             # Use the first VIN from config, or a default one
             test_vin = config.get('vins', ["WBA3A5C51CF256651"])[0]
-            decoder.decode_bmw_vin(test_vin)
+            self.source.decoder.decode_bmw_vin(test_vin)
             return True
         except Exception as e:
-            logger.error(f"Connection test failed: {str(e)}")
+            logger.error("Connection test failed: %s", e)
             return False
 
 def schema(configuration: dict):
@@ -357,26 +691,33 @@ def update(configuration: dict, state: dict):
     bmwConnector = BMWVinDecoderConnector()
     bmwConnector.setup(config)
     
-    # In a real implementation, Fivetran would call the appropriate methods
-    # This is just a demonstration of how it would work
-    if bmwConnector.test_connection(config):
-        logger.info("Connection test successful")
+    # The source holds pooled HTTP connections; release them once the sync is done
+    with bmwConnector.source:
+        # In a real implementation, Fivetran would call the appropriate methods
+        # This is just a demonstration of how it would work
+        if bmwConnector.test_connection(config):
+            logger.info("Connection test successful")
         
-        # Sync each table
-        for table in bmwConnector.schema.get_tables():
-            logger.info(f"Syncing table: {table}")
-            records = bmwConnector.source.fetch_records(table, {})
-            logger.info(f"Fetched {len(records)} records for {table}")
+            # Sync each table
+            for table in bmwConnector.schema.get_tables():
+                logger.info("Syncing table: %s", table)
+                count = 0
             
-            # In a real connector, Fivetran would handle the record processing
-            # This is just for demonstration
-            for record in records[:2]:  # Show first 2 records
-                logger.info(f"Record: {record}")
-                yield op.upsert(table, record)
-
-        yield op.checkpoint(state)
-    else:
-        logger.error("Connection test failed")
+                # Upserts are streamed as records arrive instead of after the whole table is fetched.
+                # op.upsert takes the dict as-is and the SDK converts it to typed values itself,
+                # so the only per-record serialization here is this debug line.
+                for record in bmwConnector.source.fetch_records(table, {}):
+                    logger.debug("Record: %s", record)
+                    yield op.upsert(table, record)
+                    count += 1
+                logger.info("Fetched %d records for %s", count, table)
+
+            yield op.checkpoint(state)
+        else:
+            logger.error("Connection test failed")
+
+    decode_cache = _get_decode_cache()
+    logger.info("VIN decode cache: %d hits, %d misses", decode_cache.hits, decode_cache.misses)
 
 connector = Connector(update=update)
 